@@ -11,7 +11,7 @@ from config import Config
 from dm_view import DMView
 from map_canvas import FogEditor, calculate_scale
 from models import Map, Session
-from persistence import SessionManager
+from persistence import SessionManager, probe_image_size
 from player_view import PlayerView
 
 
@@ -40,6 +40,10 @@ class Application:
         self._fog_edit_in_progress: bool = False
         self._deferred_fog_changed: bool = False
 
+        # Bumped by _update_views, which runs on every session or map switch;
+        # lets views cache get_active_map()
+        self._active_map_version: int = 0
+
         # Monitor info
         self.monitors = self._detect_monitors()
         self.player_monitor = None
@@ -195,6 +199,7 @@ class Application:
 
     def _update_views(self) -> None:
         """Update both views with current state."""
+        self._active_map_version += 1
         if not self.session:
             return
 
@@ -262,8 +267,12 @@ class Application:
             else:
                 messagebox.showerror("Error", "Invalid session directory", parent=self.root)
 
-    def save_session(self) -> None:
-        """Save the current session."""
+    def save_session(self, compact: bool = False) -> None:
+        """Save the current session.
+
+        If compact is True, fog masks are re-encoded at maximum PNG
+        compression (used once on close rather than on every save).
+        """
         if not self.session or not self.session_manager:
             return
 
@@ -276,6 +285,7 @@ class Application:
                 self.session_manager.save_fog_mask(
                     map_obj,
                     self._fog_masks[map_obj.id],
+                    compress_level=9 if compact else 1,
                 )
 
     def add_map(self, filepath: str, name: str, tile_pixels: int | None = None, tile_size_mm: float | None = None) -> None:
@@ -299,8 +309,11 @@ class Application:
             else:
                 # Legacy interactive prompts (kept for compatibility)
                 # Open source image to inspect dimensions (do not copy yet)
-                with Image.open(Path(filepath)) as src_img:
-                    img_w, img_h = src_img.size
+                size = probe_image_size(Path(filepath))
+                if size is None:
+                    with Image.open(Path(filepath)) as src_img:
+                        size = src_img.size
+                img_w, img_h = size
 
                 # Ask user which method to use
                 method = simpledialog.askstring(
@@ -415,8 +428,13 @@ class Application:
             self._map_images.pop(map_obj.id, None)
             self._fog_masks.pop(map_obj.id, None)
 
-            # Delete files
-            self.session_manager.delete_map(map_obj)
+            # Delete files, keeping the image if another map shares it
+            shared = any(
+                m.image_path == map_obj.image_path
+                for m in self.session.maps
+                if m is not map_obj
+            )
+            self.session_manager.delete_map(map_obj, keep_image=shared)
 
             # Remove from session
             self.session.remove_map(map_obj.id)
@@ -525,9 +543,9 @@ class Application:
                 pv = self.player_view
                 pv_w = pv.canvas.winfo_width()
                 pv_h = pv.canvas.winfo_height()
-                if pv_w > 1 and pv_h > 1 and pv.renderer.scale > 0:
-                    viewport_map_w = int(pv_w / pv.renderer.scale)
-                    viewport_map_h = int(pv_h / pv.renderer.scale)
+                if pv_w > 1 and pv_h > 1 and pv.scale > 0:
+                    viewport_map_w = int(pv_w / pv.scale)
+                    viewport_map_h = int(pv_h / pv.scale)
             except Exception:
                 # If we can't query player view, fall back to full image
                 viewport_map_w = img.width
@@ -551,7 +569,7 @@ class Application:
 
     def _on_close(self) -> None:
         """Handle application close."""
-        self.save_session()
+        self.save_session(compact=True)
         self.config.save()
         self.player_view.destroy()
         self.root.destroy()
@@ -6,8 +6,9 @@ from typing import TYPE_CHECKING, Optional
 
 from PIL import Image, ImageTk
 import math
+import numpy as np
 
-from map_canvas import FogEditor, MapRenderer, screen_to_map, map_to_screen
+from map_canvas import FogEditor, MapRenderer, screen_to_map, screen_to_map_batch, map_to_screen
 from map_import_dialog import MapImportDialog
 
 if TYPE_CHECKING:
@@ -40,7 +41,7 @@ class DMView:
 
         # Brush stroke state (for smooth, interpolated drawing)
         self._brush_editor: Optional[FogEditor] = None
-        self._brush_last_map_pos: Optional[tuple[int, int]] = None
+        self._brush_last_screen_pos: Optional[tuple[int, int]] = None
 
         # Brush preview state (circle that follows mouse)
         self._brush_preview_id: Optional[int] = None
@@ -439,6 +440,19 @@ class DMView:
             self._preview_offset,
         )
 
+    def _screen_to_map_coords_batch(
+        self, xs: np.ndarray, ys: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized _screen_to_map_coords for many points (e.g. stroke interpolation)."""
+        return screen_to_map_batch(
+            xs,
+            ys,
+            self.renderer.scale,
+            0,
+            0,
+            self._preview_offset,
+        )
+
     def _apply_brush(self, screen_x: int, screen_y: int) -> None:
         """One-off brush apply (single click)."""
         fog_mask = self.app.get_current_fog_ref()
@@ -471,41 +485,43 @@ class DMView:
         # Editor works directly on the in-memory fog mask reference
         self._brush_editor = FogEditor(fog_mask)
         self._brush_editor.apply_brush(map_x, map_y, brush_radius, self.reveal_mode)
-        self._brush_last_map_pos = (map_x, map_y)
+        self._brush_last_screen_pos = (screen_x, screen_y)
 
         # Update DM view immediately (player & disk will be deferred until end)
         self.app.update_fog(self._brush_editor.get_mask())
 
     def _continue_brush(self, screen_x: int, screen_y: int) -> None:
         """Continue stroke: interpolate between last and current positions to avoid gaps."""
-        if self._brush_editor is None or self._brush_last_map_pos is None:
+        if self._brush_editor is None or self._brush_last_screen_pos is None:
             # If we somehow missed the start, treat as fresh start
             self._start_brush(screen_x, screen_y)
             return
 
-        map_x, map_y = self._screen_to_map_coords(screen_x, screen_y)
-        last_x, last_y = self._brush_last_map_pos
+        last_x, last_y = self._brush_last_screen_pos
 
-        dx = map_x - last_x
-        dy = map_y - last_y
-        dist = math.hypot(dx, dy)
+        dx = screen_x - last_x
+        dy = screen_y - last_y
+        scale = max(0.0001, self.renderer.scale)
+        # Stroke length in map pixels
+        dist = math.hypot(dx, dy) / scale
 
-        brush_radius = max(1, int(self.brush_size / max(0.0001, self.renderer.scale)))
+        brush_radius = max(1, int(self.brush_size / scale))
 
         if dist <= 0:
+            map_x, map_y = self._screen_to_map_coords(screen_x, screen_y)
             self._brush_editor.apply_brush(map_x, map_y, brush_radius, self.reveal_mode)
         else:
             # step size proportional to radius to guarantee overlap
             step = max(1, int(brush_radius * 0.5))
             steps = max(1, int(dist / step))
-            for i in range(1, steps + 1):
-                t = i / steps
-                ix = int(last_x + dx * t)
-                iy = int(last_y + dy * t)
+            # Interpolate in screen space and convert all stroke points at once
+            t = np.arange(1, steps + 1) / steps
+            map_xs, map_ys = self._screen_to_map_coords_batch(last_x + dx * t, last_y + dy * t)
+            for ix, iy in zip(map_xs.tolist(), map_ys.tolist()):
                 self._brush_editor.apply_brush(ix, iy, brush_radius, self.reveal_mode)
 
         # Update DM view with current in-memory mask
-        self._brush_last_map_pos = (map_x, map_y)
+        self._brush_last_screen_pos = (screen_x, screen_y)
         self.app.update_fog(self._brush_editor.get_mask())
 
     def _end_brush(self) -> None:
@@ -521,7 +537,7 @@ class DMView:
 
         # Clear stroke state
         self._brush_editor = None
-        self._brush_last_map_pos = None
+        self._brush_last_screen_pos = None
 
     def _draw_rect_preview(self, x: int, y: int) -> None:
         """Draw rectangle selection preview."""
@@ -655,14 +671,13 @@ class DMView:
 
     def update_fog(self, fog_mask: Image.Image) -> None:
         """Update the fog mask."""
-        if self.renderer.map_image is not None:
-            self.renderer.fog_mask = fog_mask.convert("L")
-            self.renderer.invalidate_cache()
+        if self.renderer.map_image_pm is not None:
+            self.renderer.set_fog(fog_mask)
             self.refresh()
 
     def refresh(self) -> None:
         """Refresh the preview display."""
-        if self.renderer.map_image is None:
+        if self.renderer.map_image_pm is None:
             return
 
         width = self.preview_canvas.winfo_width()
@@ -672,8 +687,8 @@ class DMView:
             return
 
         # Calculate scale to fit map in preview
-        map_w = self.renderer.map_image.width
-        map_h = self.renderer.map_image.height
+        map_w = self.renderer.map_image_pm.width
+        map_h = self.renderer.map_image_pm.height
 
         scale_w = width / map_w
         scale_h = height / map_h
@@ -719,7 +734,7 @@ class DMView:
                     pv_h = pv.canvas.winfo_height()
                     # Proceed only if valid size
                     if pv_w > 1 and pv_h > 1 and active_map is not None:
-                        player_scale = pv.renderer.scale
+                        player_scale = pv.scale
                         player_pan_x = active_map.pan_x
                         player_pan_y = active_map.pan_y
 
@@ -1,27 +1,248 @@
 """Shared rendering logic for map display with fog of war."""
 
+import contextlib
+import threading
+from functools import lru_cache
 from typing import Optional, Tuple
 
-from PIL import Image, ImageDraw, ImageOps, ImageTk
+import numpy as np
+from PIL import Image, ImageDraw, ImageTk
+
+try:
+    import cv2
+except ImportError:
+    # OpenCV is optional; Pillow is used for resizing when it is missing
+    cv2 = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional; the NumPy compositor is used when it is missing
+    njit = None
+
+try:
+    from numba import cuda
+except ImportError:
+    # Numba's CUDA target is optional; large frames composite on the CPU without it
+    cuda = None
+
+
+def premultiply_alpha(image: Image.Image) -> Image.Image:
+    """
+    Fold the alpha channel of an image into its colour channels.
+
+    The result is an RGB image equal to the map composited over black, so the
+    per-frame compositor only has to scale colours by fog visibility.
+
+    Args:
+        image: Source image, normally RGBA; other modes are converted first
+
+    Returns:
+        RGB image with premultiplied colours
+    """
+    if image.mode != "RGBA":
+        if "A" not in image.getbands() and "transparency" not in image.info:
+            # No alpha to fold in
+            return image.convert("RGB")
+        image = image.convert("RGBA")
+    if image.getextrema()[3][0] == 255:
+        # Fully opaque: premultiplying is the identity
+        return image.convert("RGB")
+
+    arr = np.asarray(image)
+    alpha = arr[..., 3:4].astype(np.uint16)
+    rgb = (arr[..., :3].astype(np.uint16) * alpha // 255).astype(np.uint8)
+    return Image.fromarray(rgb)
+
+
+def _visibility_lut(fog_opacity: int) -> list[int]:
+    """Lookup table mapping fog mask values to map visibility (255 = fully visible)."""
+    return [255 - (255 - p) * fog_opacity // 255 for p in range(256)]
+
+
+def _fog_blend_numpy(
+    map_rgb: np.ndarray, fog: np.ndarray, fog_opacity: int, out: np.ndarray
+) -> None:
+    """Write map_rgb darkened by the fog mask into out (NumPy fallback)."""
+    visibility = np.array(_visibility_lut(int(fog_opacity)), dtype=np.uint16)[fog]
+    out[...] = map_rgb * visibility[..., None] // 255
+
+
+def _bit_visibility(fog_opacity: int) -> np.ndarray:
+    """Visibility of hidden (bit 0) and revealed (bit 1) pixels in a packed fog mask."""
+    return np.array([_visibility_lut(fog_opacity)[0], 255], dtype=np.uint8)
+
+
+def _fog_blend_bits_numpy(
+    map_rgb: np.ndarray,
+    fog_bits: np.ndarray,
+    bit_offset: int,
+    visibility: np.ndarray,
+    out: np.ndarray,
+) -> None:
+    """Write map_rgb darkened by a bit-packed fog mask into out (NumPy fallback)."""
+    width = out.shape[1]
+    bits = np.unpackbits(fog_bits, axis=1)[:, bit_offset:bit_offset + width]
+    out[...] = map_rgb * visibility.astype(np.uint16)[bits][..., None] // 255
+
+
+if njit is not None:
+    # Explicit signatures compile at import; cache=True stores the result on
+    # disk so later runs skip compilation entirely. Whole cached layers are
+    # C-contiguous; viewport slices of them only have contiguous rows, so they
+    # get their own specialization instead of being copied per frame.
+    @njit(
+        [
+            "void(uint8[:,:,::1], uint8[:,::1], uint8, uint8[:,:,::1])",
+            "void(uint8[:,:,:], uint8[:,:], uint8, uint8[:,:,::1])",
+        ],
+        parallel=True,
+        cache=True,
+        fastmath=True,
+        boundscheck=False,
+    )
+    def fog_blend(map_rgb, fog, fog_opacity, out):
+        """Write map_rgb darkened by the fog mask into out."""
+        height, width = fog.shape
+        for y in prange(height):
+            for x in range(width):
+                hidden = (255 - np.int32(fog[y, x])) * np.int32(fog_opacity) // 255
+                visibility = 255 - hidden
+                for c in range(3):
+                    out[y, x, c] = np.int32(map_rgb[y, x, c]) * visibility // 255
+
+    @njit(
+        [
+            "void(uint8[:,:,::1], uint8[:,::1], int64, uint8[::1], uint8[:,:,::1])",
+            "void(uint8[:,:,:], uint8[:,:], int64, uint8[::1], uint8[:,:,::1])",
+        ],
+        parallel=True,
+        cache=True,
+        fastmath=True,
+        boundscheck=False,
+    )
+    def fog_blend_bits(map_rgb, fog_bits, bit_offset, visibility, out):
+        """
+        Write map_rgb darkened by a bit-packed fog mask into out.
+
+        Column x of the output reads bit bit_offset + x of the mask rows (MSB
+        first, as np.packbits), so unaligned viewport slices need no repacking.
+        """
+        height, width = out.shape[0], out.shape[1]
+        for y in prange(height):
+            for x in range(width):
+                bx = bit_offset + x
+                v = np.int32(visibility[(fog_bits[y, bx >> 3] >> (7 - (bx & 7))) & 1])
+                for c in range(3):
+                    out[y, x, c] = np.int32(map_rgb[y, x, c]) * v // 255
+else:
+    fog_blend = _fog_blend_numpy
+    fog_blend_bits = _fog_blend_bits_numpy
+
+# The parallel kernels must not run on two threads at once (the DM view renders
+# on the Tk thread, the player view on a worker): Numba's fallback workqueue
+# threading layer aborts the process on concurrent use. NumPy needs no lock.
+_kernel_lock = threading.Lock() if njit is not None else contextlib.nullcontext()
+
+if cuda is not None:
+    # Compiled on first launch, so importing costs nothing without a GPU
+    @cuda.jit
+    def _fog_blend_bits_gpu(map_rgb, fog_bits, top, left, visibility, out):
+        """
+        Write the region of map_rgb at (top, left) darkened by the packed fog into out.
+
+        map_rgb and fog_bits are whole scaled layers kept on the device; one
+        thread computes one output pixel.
+        """
+        y, x = cuda.grid(2)
+        if y < out.shape[0] and x < out.shape[1]:
+            sy = top + y
+            sx = left + x
+            v = np.int32(visibility[(fog_bits[sy, sx >> 3] >> (7 - (sx & 7))) & 1])
+            for c in range(3):
+                out[y, x, c] = np.int32(map_rgb[sy, sx, c]) * v // 255
+
+
+@lru_cache(maxsize=None)
+def _gpu_available() -> bool:
+    """Whether a CUDA device can be used for compositing."""
+    if cuda is None:
+        return False
+    try:
+        return cuda.is_available()
+    except Exception:
+        return False
 
 
 class MapRenderer:
     """Handles map rendering with fog of war compositing."""
 
+    # Edge length of the viewport tiles re-rendered by render_fog_update
+    UPDATE_TILE_SIZE = 256
+    # Visible regions of at least this many pixels are composited on the GPU
+    # when one is available; smaller ones are not worth the transfer
+    GPU_MIN_PIXELS = 1 << 20
+
     def __init__(self):
         """Initialize renderer."""
-        self.map_image: Optional[Image.Image] = None
+        # Premultiplied RGB copy of the map, the only one the renderer keeps;
+        # None until set_map
+        self.map_image_pm: Optional[Image.Image] = None
+        # map_image_pm halved repeatedly (level 0 is map_image_pm); built on demand
+        self._map_mips: list[Image.Image] = []
         self.fog_mask: Optional[Image.Image] = None
         self.scale: float = 1.0
-        self._cached_render: Optional[Image.Image] = None
+        # Map scaled for render(); valid until the map or scale changes
+        self._cached_render: Optional[np.ndarray] = None
         self._cache_valid: bool = False
+        # Fog scaled for render() and packed to 1 bit per pixel (np.packbits
+        # along rows), with the (size, fog version) it was made for
+        self._scaled_fog: Optional[np.ndarray] = None
+        self._scaled_fog_key: Optional[tuple] = None
+
+        # Bumped whenever the fog mask changes; part of the thumbnail cache key
+        self._fog_version: int = 0
+        self._thumb_cache: dict[tuple, ImageTk.PhotoImage] = {}
+
+        # Persistent Tk image reused across frames; reallocated on viewport resize
+        self._photo: Optional[ImageTk.PhotoImage] = None
+        self._photo_size: Optional[Tuple[int, int]] = None
+
+        # Viewport parameters and visible packed fog of the last render_array() frame
+        self._frame_view: Optional[tuple] = None
+        self._frame_fog: Optional[np.ndarray] = None
+
+        # Compositor output for a visible region smaller than the viewport,
+        # reused by render_array(); reallocated when that region's size changes
+        self._out: Optional[np.ndarray] = None
+        # Viewport-sized frame buffer reused by render()
+        self._frame: Optional[np.ndarray] = None
+
+        # Device copies of the cached scaled map and packed fog, uploaded only
+        # when those change, and the device output buffer for the visible region
+        self._use_gpu: bool = _gpu_available()
+        self._gpu_map = None
+        self._gpu_fog = None
+        self._gpu_fog_key: Optional[tuple] = None
+        self._gpu_out = None
 
     def set_map(self, map_image: Image.Image, fog_mask: Image.Image) -> None:
         """Set the map image and fog mask."""
-        self.map_image = map_image.convert("RGBA")
-        self.fog_mask = fog_mask.convert("L")
+        self.map_image_pm = premultiply_alpha(map_image)
+        self._map_mips = [self.map_image_pm]
+        self._frame_view = None
+        self.fog_mask = fog_mask if fog_mask.mode == "L" else fog_mask.convert("L")
+        self._fog_version += 1
+        self._thumb_cache.clear()
         self._cache_valid = False
 
+    def set_fog(self, fog_mask: Image.Image) -> None:
+        """Replace the fog mask, keeping the current map."""
+        # convert("L") on an "L" image would still copy every pixel
+        self.fog_mask = fog_mask if fog_mask.mode == "L" else fog_mask.convert("L")
+        self._fog_version += 1
+        self._thumb_cache.clear()
+
     def set_scale(self, scale: float) -> None:
         """Set the rendering scale."""
         if self.scale != scale:
@@ -32,52 +253,173 @@ class MapRenderer:
         """Mark the render cache as invalid."""
         self._cache_valid = False
 
-    def render(
-        self,
-        viewport_size: Tuple[int, int],
-        pan_x: int,
-        pan_y: int,
-        is_dm_view: bool = False,
-    ) -> Optional[ImageTk.PhotoImage]:
+    def _map_level(self, scaled_w: int) -> Image.Image:
         """
-        Render the map with fog overlay for the given viewport.
+        Return the smallest map mip level at least scaled_w pixels wide.
 
-        Args:
-            viewport_size: (width, height) of the display area
-            pan_x: Horizontal pan offset in map pixels
-            pan_y: Vertical pan offset in map pixels
-            is_dm_view: If True, fog is semi-transparent; if False, fully opaque
+        Zooming out then resamples a level close to the target size instead of
+        the full-resolution map, so the bytes read scale with the output.
+        """
+        while True:
+            level = self._map_mips[-1]
+            if level.width // 2 < scaled_w or min(level.size) < 2:
+                break
+            # Box-filtered halving, so smaller levels stay antialiased
+            self._map_mips.append(level.reduce(2))
+
+        for level in reversed(self._map_mips):
+            if level.width >= scaled_w:
+                return level
+        return self._map_mips[0]
+
+    def _scale_map(self, scaled_w: int, scaled_h: int) -> np.ndarray:
+        """
+        Resize the premultiplied map to the given size.
+
+        Uses OpenCV's multi-threaded SIMD resize when available (area
+        averaging when shrinking, bilinear when enlarging), otherwise Pillow.
 
         Returns:
-            PhotoImage ready for Tkinter display, or None if no map loaded
+            Writable C-contiguous uint8 array of shape (h, w, 3)
         """
-        if self.map_image is None or self.fog_mask is None:
-            return None
+        source = self._map_level(scaled_w)
+        if cv2 is not None:
+            # INTER_AREA only averages properly when shrinking
+            if scaled_w < source.width:
+                interpolation = cv2.INTER_AREA
+            else:
+                interpolation = cv2.INTER_LINEAR
+            return cv2.resize(
+                np.asarray(source),
+                (scaled_w, scaled_h),
+                interpolation=interpolation,
+            )
+
+        scaled_map = source.resize((scaled_w, scaled_h), Image.LANCZOS, reducing_gap=2.0)
+        # np.array copies into a writable array; np.asarray views of Pillow
+        # images are read-only, which the compiled kernel rejects
+        return np.array(scaled_map)
+
+    def _scale_fog(self, scaled_w: int, scaled_h: int) -> np.ndarray:
+        """
+        Resize the fog mask to the given size (nearest neighbour).
 
-        viewport_w, viewport_h = viewport_size
+        Returns:
+            Writable C-contiguous uint8 array of shape (h, w)
+        """
+        if cv2 is not None:
+            return cv2.resize(
+                np.asarray(self.fog_mask),
+                (scaled_w, scaled_h),
+                interpolation=cv2.INTER_NEAREST,
+            )
+        return np.array(self.fog_mask.resize((scaled_w, scaled_h), Image.NEAREST))
+
+    def _scale_layers(
+        self, scaled_w: int, scaled_h: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Resize the premultiplied map and the fog mask to the given size.
 
-        # Calculate scaled dimensions
-        scaled_w = int(self.map_image.width * self.scale)
-        scaled_h = int(self.map_image.height * self.scale)
+        Returns:
+            (scaled_map, scaled_fog) as writable C-contiguous uint8 arrays of
+            shape (h, w, 3) and (h, w)
+        """
+        return self._scale_map(scaled_w, scaled_h), self._scale_fog(scaled_w, scaled_h)
+
+    @staticmethod
+    def _composite(
+        scaled_map: np.ndarray,
+        scaled_fog: np.ndarray,
+        fog_opacity: int,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Darken a premultiplied map by the fog mask.
 
-        # Scale map and fog
-        scaled_map = self.map_image.resize((scaled_w, scaled_h), Image.LANCZOS)
-        scaled_fog = self.fog_mask.resize((scaled_w, scaled_h), Image.NEAREST)
+        Hidden areas (black in the mask) are blended towards black by
+        fog_opacity / 255; revealed areas (white) are left untouched.
 
-        # Create fog overlay
-        fog_opacity = 120 if is_dm_view else 255
+        Args:
+            scaled_map: Premultiplied RGB map, (h, w, 3)
+            scaled_fog: Fog mask, (h, w)
+            fog_opacity: Darkening of fully hidden areas (0-255)
+            out: Optional C-contiguous uint8 buffer of the map's shape to
+                write into instead of allocating one
 
-        # Invert fog mask: black (hidden) becomes opaque, white (revealed) becomes transparent
-        inverted_fog = ImageOps.invert(scaled_fog)
+        Returns:
+            The composited RGB array (out, if given)
+        """
+        # The compiled kernel takes writable uint8 layers (see _scale_map)
+        assert scaled_map.dtype == np.uint8 and scaled_map.ndim == 3
+        assert scaled_fog.dtype == np.uint8 and scaled_fog.ndim == 2
+
+        if out is None:
+            out = np.empty_like(scaled_map)
+        with _kernel_lock:
+            fog_blend(scaled_map, scaled_fog, np.uint8(fog_opacity), out)
+        return out
+
+    @staticmethod
+    def _composite_bits(
+        scaled_map: np.ndarray,
+        fog_bits: np.ndarray,
+        bit_offset: int,
+        fog_opacity: int,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Darken a premultiplied map by a bit-packed fog mask.
 
-        # Scale inverted mask by desired opacity so DM view fog is semi-transparent
-        # (i.e. multiply each pixel by fog_opacity / 255)
-        alpha_mask = inverted_fog.point(lambda p: int(p * fog_opacity / 255))
-        fog_rgba = Image.new("RGBA", (scaled_w, scaled_h), (0, 0, 0, 0))
-        fog_rgba.putalpha(alpha_mask)
+        Like _composite, with the mask as produced by _visible_layers: pixel
+        x of a row is bit bit_offset + x of the packed row.
+
+        Returns:
+            The composited RGB array (out, if given)
+        """
+        assert scaled_map.dtype == np.uint8 and scaled_map.ndim == 3
+        assert fog_bits.dtype == np.uint8 and fog_bits.ndim == 2
+
+        if out is None:
+            out = np.empty_like(scaled_map)
+        with _kernel_lock:
+            fog_blend_bits(scaled_map, fog_bits, bit_offset, _bit_visibility(fog_opacity), out)
+        return out
+
+    def _visible_layers(
+        self, viewport_size: Tuple[int, int], pan_x: int, pan_y: int
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, int, int, int, int, int]]:
+        """
+        Scale the layers as needed and cut out the part shown in the viewport.
 
-        # Composite fog over map
-        composited = Image.alpha_composite(scaled_map, fog_rgba)
+        Returns:
+            (visible_map, fog_bits, bit_offset, paste_x, paste_y, top, left),
+            where the arrays are views into the cached scaled layers, fog_bits
+            holds the packed fog bytes covering the visible columns starting
+            at bit bit_offset, paste_x/paste_y place the region within the
+            viewport and top/left locate it within the scaled layers; None if
+            nothing is visible
+        """
+        viewport_w, viewport_h = viewport_size
+
+        # Calculate scaled dimensions
+        scaled_w = int(self.map_image_pm.width * self.scale)
+        scaled_h = int(self.map_image_pm.height * self.scale)
+
+        # Scale map and fog; panning alone reuses the previous results, and a
+        # fog change only rescales the fog
+        if not self._cache_valid or self._cached_render is None:
+            self._cached_render = self._scale_map(scaled_w, scaled_h)
+            self._cache_valid = True
+            self._gpu_map = None
+        scaled_map = self._cached_render
+        fog_key = (scaled_w, scaled_h, self._fog_version)
+        if self._scaled_fog_key != fog_key:
+            # Fog is binary in practice (brushes paint 0 or 255); 1 bit per
+            # pixel cuts the compositor's fog reads eightfold
+            self._scaled_fog = np.packbits(self._scale_fog(scaled_w, scaled_h) >= 128, axis=1)
+            self._scaled_fog_key = fog_key
+        scaled_fog = self._scaled_fog
 
         # Calculate crop region based on pan
         scaled_pan_x = int(pan_x * self.scale)
@@ -96,60 +438,284 @@ class MapRenderer:
         if right <= left or bottom <= top:
             return None
 
-        cropped = composited.crop((left, top, right, bottom))
-
-        # Create final image centered in viewport
-        final = Image.new("RGBA", viewport_size, (30, 30, 30, 255))
-        paste_x = max(0, (viewport_w - cropped.width) // 2) if cropped.width < viewport_w else 0
-        paste_y = max(0, (viewport_h - cropped.height) // 2) if cropped.height < viewport_h else 0
+        # Position of the map within the viewport (centered when smaller)
+        paste_x = max(0, (viewport_w - (right - left)) // 2) if right - left < viewport_w else 0
+        paste_y = max(0, (viewport_h - (bottom - top)) // 2) if bottom - top < viewport_h else 0
 
         # Handle case where map is smaller than viewport
         if scaled_w < viewport_w:
             paste_x = (viewport_w - scaled_w) // 2
             left = 0
             right = scaled_w
-            cropped = composited.crop((0, top, scaled_w, bottom))
 
         if scaled_h < viewport_h:
             paste_y = (viewport_h - scaled_h) // 2
             top = 0
             bottom = scaled_h
-            cropped = composited.crop((left, 0, right, scaled_h))
 
-        final.paste(cropped, (paste_x, paste_y))
+        # Slicing the cached layers is free: only the visible region is composited
+        return (
+            scaled_map[top:bottom, left:right],
+            scaled_fog[top:bottom, left >> 3:(right + 7) >> 3],
+            left & 7,
+            paste_x,
+            paste_y,
+            top,
+            left,
+        )
+
+    def _composite_gpu(self, top: int, left: int, fog_opacity: int, out: np.ndarray) -> bool:
+        """
+        Composite the visible region at (top, left) of the scaled layers on the GPU.
+
+        Must follow a _visible_layers() call for the same frame. The scaled
+        map and fog stay resident on the device, so a frame only uploads what
+        changed and downloads the composited region.
+
+        Args:
+            top: First row of the region in the scaled layers
+            left: First column of the region in the scaled layers
+            fog_opacity: Fog opacity (0-255)
+            out: C-contiguous (h, w, 3) uint8 array receiving the region
+
+        Returns:
+            True on success; False if the CPU compositor has to be used
+        """
+        try:
+            if self._gpu_map is None:
+                self._gpu_map = cuda.to_device(self._cached_render)
+            if self._gpu_fog_key != self._scaled_fog_key:
+                self._gpu_fog = cuda.to_device(self._scaled_fog)
+                self._gpu_fog_key = self._scaled_fog_key
+            if self._gpu_out is None or self._gpu_out.shape != out.shape:
+                self._gpu_out = cuda.device_array(out.shape, dtype=np.uint8)
+
+            height, width = out.shape[:2]
+            block = (16, 16)
+            grid = ((height + 15) // 16, (width + 15) // 16)
+            _fog_blend_bits_gpu[grid, block](
+                self._gpu_map,
+                self._gpu_fog,
+                top,
+                left,
+                cuda.to_device(_bit_visibility(fog_opacity)),
+                self._gpu_out,
+            )
+            self._gpu_out.copy_to_host(out)
+            return True
+        except Exception as e:
+            # Out of device memory, driver trouble, ...: stay on the CPU from now on
+            print(f"GPU compositing disabled: {e}")
+            self._use_gpu = False
+            self._gpu_map = self._gpu_fog = self._gpu_fog_key = self._gpu_out = None
+            return False
+
+    def render(
+        self,
+        viewport_size: Tuple[int, int],
+        pan_x: int,
+        pan_y: int,
+        is_dm_view: bool = False,
+    ) -> Optional[ImageTk.PhotoImage]:
+        """
+        Render the map with fog overlay for the given viewport.
+
+        Args:
+            viewport_size: (width, height) of the display area
+            pan_x: Horizontal pan offset in map pixels
+            pan_y: Vertical pan offset in map pixels
+            is_dm_view: If True, fog is semi-transparent; if False, fully opaque
+
+        Returns:
+            PhotoImage ready for Tkinter display, or None if no map loaded.
+            The same PhotoImage is reused (and overwritten) by later calls.
+        """
+        viewport_w, viewport_h = viewport_size
+        if self._frame is None or self._frame.shape[:2] != (viewport_h, viewport_w):
+            self._frame = np.empty((viewport_h, viewport_w, 3), dtype=np.uint8)
+        final = self.render_image(viewport_size, pan_x, pan_y, is_dm_view, out=self._frame)
+        if final is None:
+            return None
+
+        # Update the persistent Tk image in place instead of allocating a new one
+        if self._photo_size != tuple(viewport_size):
+            self._photo = ImageTk.PhotoImage("RGB", viewport_size)
+            self._photo_size = tuple(viewport_size)
+        self._photo.paste(final)
+        return self._photo
+
+    def render_image(
+        self,
+        viewport_size: Tuple[int, int],
+        pan_x: int,
+        pan_y: int,
+        is_dm_view: bool = False,
+        out: Optional[np.ndarray] = None,
+    ) -> Optional[Image.Image]:
+        """
+        Render the viewport like render(), but return a PIL image.
+
+        For callers that manage their own Tk images. Arguments are as for
+        render_array.
+
+        Returns:
+            RGB image of viewport_size, or None if no map loaded
+        """
+        frame = self.render_array(viewport_size, pan_x, pan_y, is_dm_view, out)
+        if frame is None:
+            return None
+        # Pillow only shares 1- and 4-byte-per-pixel buffers, so this copies;
+        # the copy is what lets callers reuse out for the next frame
+        return Image.fromarray(frame)
+
+    def render_array(
+        self,
+        viewport_size: Tuple[int, int],
+        pan_x: int,
+        pan_y: int,
+        is_dm_view: bool = False,
+        out: Optional[np.ndarray] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Render the viewport into an RGB array.
 
-        return ImageTk.PhotoImage(final)
+        Args:
+            viewport_size: (width, height) of the display area
+            pan_x: Horizontal pan offset in map pixels
+            pan_y: Vertical pan offset in map pixels
+            is_dm_view: If True, fog is semi-transparent; if False, fully opaque
+            out: Optional C-contiguous uint8 buffer of shape (height, width, 3)
+                to compose the frame in, so repeated renders don't allocate
+
+        Returns:
+            The (height, width, 3) frame (out, if given), or None if no map
+            loaded
+        """
+        if self.map_image_pm is None or self.fog_mask is None:
+            return None
+
+        visible = self._visible_layers(viewport_size, pan_x, pan_y)
+        if visible is None:
+            return None
+        visible_map, fog_bits, bit_offset, paste_x, paste_y, top, left = visible
+        viewport_w, viewport_h = viewport_size
+        if out is None:
+            out = np.empty((viewport_h, viewport_w, 3), dtype=np.uint8)
+
+        # Fog is semi-transparent for the DM and fully opaque for players
+        fog_opacity = 120 if is_dm_view else 255
+        map_h, map_w = visible_map.shape[:2]
+        use_gpu = self._use_gpu and map_w * map_h >= self.GPU_MIN_PIXELS
+        if (map_w, map_h) == (viewport_w, viewport_h):
+            # Map covers the whole viewport: composite straight into the frame
+            if not (use_gpu and self._composite_gpu(top, left, fog_opacity, out)):
+                self._composite_bits(visible_map, fog_bits, bit_offset, fog_opacity, out)
+        else:
+            if self._out is None or self._out.shape != visible_map.shape:
+                self._out = np.empty(visible_map.shape, dtype=np.uint8)
+            if not (use_gpu and self._composite_gpu(top, left, fog_opacity, self._out)):
+                self._composite_bits(visible_map, fog_bits, bit_offset, fog_opacity, self._out)
+            # Background only around the map, so no pixel is written twice
+            bottom, right = paste_y + map_h, paste_x + map_w
+            out[:paste_y] = 30
+            out[bottom:] = 30
+            out[paste_y:bottom, :paste_x] = 30
+            out[paste_y:bottom, right:] = 30
+            out[paste_y:bottom, paste_x:right] = self._out
+
+        # Remember what is on screen so render_fog_update can patch it
+        self._frame_view = (tuple(viewport_size), pan_x, pan_y, self.scale, is_dm_view)
+        self._frame_fog = fog_bits
+        return out
+
+    def render_fog_update(
+        self,
+        viewport_size: Tuple[int, int],
+        pan_x: int,
+        pan_y: int,
+        is_dm_view: bool = False,
+    ) -> Optional[list[Tuple[int, int, np.ndarray]]]:
+        """
+        Re-render only the viewport tiles whose fog changed since the last frame.
+
+        Valid when the previous render_array() call used the same viewport,
+        pan, scale and fog mode and only the fog has changed since.
+
+        Returns:
+            (x, y, rgb) patches in viewport coordinates to draw over the last
+            frame, as C-contiguous (h, w, 3) uint8 arrays (empty if nothing
+            visible changed), or None if a full render is needed instead
+        """
+        if self.map_image_pm is None or self.fog_mask is None:
+            return None
+        view = (tuple(viewport_size), pan_x, pan_y, self.scale, is_dm_view)
+        if view != self._frame_view or not self._cache_valid or self._frame_fog is None:
+            return None
+
+        visible = self._visible_layers(viewport_size, pan_x, pan_y)
+        if visible is None:
+            return None
+        visible_map, fog_bits, bit_offset, paste_x, paste_y, _, _ = visible
+        if fog_bits.shape != self._frame_fog.shape:
+            return None
+
+        # Compared a packed byte (8 pixels) at a time
+        changed = fog_bits != self._frame_fog
+        fog_opacity = 120 if is_dm_view else 255
+        tile = self.UPDATE_TILE_SIZE
+        patches = []
+        height, width = visible_map.shape[:2]
+        for y in range(0, height, tile):
+            for x in range(0, width, tile):
+                tile_map = visible_map[y:y + tile, x:x + tile]
+                # Packed bytes holding this tile's columns
+                first_bit = bit_offset + x
+                last_bit = first_bit + tile_map.shape[1]
+                byte_cols = slice(first_bit >> 3, (last_bit + 7) >> 3)
+                if changed[y:y + tile, byte_cols].any():
+                    patch = self._composite_bits(
+                        tile_map,
+                        fog_bits[y:y + tile, byte_cols],
+                        first_bit & 7,
+                        fog_opacity,
+                    )
+                    patches.append((paste_x + x, paste_y + y, patch))
+
+        self._frame_fog = fog_bits
+        return patches
 
     def render_thumbnail(
         self, size: Tuple[int, int], is_dm_view: bool = True
     ) -> Optional[ImageTk.PhotoImage]:
         """Render a thumbnail of the full map."""
-        if self.map_image is None or self.fog_mask is None:
+        if self.map_image_pm is None or self.fog_mask is None:
             return None
 
+        # Map and fog only change through set_map/set_fog, so reuse earlier results
+        cache_key = (tuple(size), is_dm_view, self._fog_version)
+        cached = self._thumb_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         # Calculate thumbnail scale to fit in size while preserving aspect ratio
         thumb_w, thumb_h = size
-        scale_w = thumb_w / self.map_image.width
-        scale_h = thumb_h / self.map_image.height
+        scale_w = thumb_w / self.map_image_pm.width
+        scale_h = thumb_h / self.map_image_pm.height
         thumb_scale = min(scale_w, scale_h)
 
-        scaled_w = int(self.map_image.width * thumb_scale)
-        scaled_h = int(self.map_image.height * thumb_scale)
+        scaled_w = int(self.map_image_pm.width * thumb_scale)
+        scaled_h = int(self.map_image_pm.height * thumb_scale)
 
         # Scale map and fog
-        scaled_map = self.map_image.resize((scaled_w, scaled_h), Image.LANCZOS)
-        scaled_fog = self.fog_mask.resize((scaled_w, scaled_h), Image.NEAREST)
+        scaled_map, scaled_fog = self._scale_layers(scaled_w, scaled_h)
 
         # Create fog overlay for thumbnail
         fog_opacity = 200 if is_dm_view else 255
-        inverted_fog = ImageOps.invert(scaled_fog)
-        alpha_mask = inverted_fog.point(lambda p: int(p * fog_opacity / 255))
-        fog_rgba = Image.new("RGBA", (scaled_w, scaled_h), (0, 0, 0, 0))
-        fog_rgba.putalpha(alpha_mask)
-
-        composited = Image.alpha_composite(scaled_map, fog_rgba)
+        composited = Image.fromarray(self._composite(scaled_map, scaled_fog, fog_opacity))
 
-        return ImageTk.PhotoImage(composited)
+        thumbnail = ImageTk.PhotoImage(composited)
+        self._thumb_cache[cache_key] = thumbnail
+        return thumbnail
 
 
 class FogEditor:
@@ -282,3 +848,26 @@ def map_to_screen(
     screen_x = int((map_x - pan_x) * scale + offset_x)
     screen_y = int((map_y - pan_y) * scale + offset_y)
     return screen_x, screen_y
+
+
+def screen_to_map_batch(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    scale: float,
+    pan_x: int,
+    pan_y: int,
+    viewport_offset: Tuple[int, int] = (0, 0),
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert arrays of screen coordinates to map coordinates.
+
+    Vectorized form of screen_to_map, for callers converting many points at
+    once (e.g. interpolated brush strokes).
+
+    Returns:
+        (map_xs, map_ys) as int32 arrays in original map pixel coordinates
+    """
+    offset_x, offset_y = viewport_offset
+    map_xs = ((np.asarray(xs) - offset_x) / scale + pan_x).astype(np.int32)
+    map_ys = ((np.asarray(ys) - offset_y) / scale + pan_y).astype(np.int32)
+    return map_xs, map_ys
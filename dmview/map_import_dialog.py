@@ -9,12 +9,60 @@ Methods implemented:
  - Draw 3x3 sample (placeholder)
 """
 
+import math
 import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import ttk, filedialog, messagebox
 from typing import Optional, Callable
 from pathlib import Path
 from PIL import Image, ImageTk
 
+from persistence import probe_image_size
+
+
+SCALING_METHODS = ("image_width", "tiles", "sample")
+
+
+def compute_tile_pixels(img_w: int, method: str, params: dict) -> tuple[int, float]:
+    """
+    Compute source pixels per tile for a scaling method.
+
+    Args:
+        img_w: Source image width in pixels
+        method: One of SCALING_METHODS
+        params: Method inputs. All methods use "tile_size_mm" (falls back to
+            "default_tile_mm" when <= 0); "image_width" also needs "width_mm",
+            "tiles" needs "tiles_x" and "sample" needs "pixels_per_tile".
+
+    Returns:
+        (tile_pixels, tile_size_mm)
+
+    Raises:
+        ValueError: If an input is missing or out of range
+    """
+    tile_size_mm = float(params["tile_size_mm"])
+    if tile_size_mm <= 0:
+        tile_size_mm = float(params["default_tile_mm"])
+
+    if method == "image_width":
+        width_mm = float(params["width_mm"])
+        if width_mm <= 0:
+            raise ValueError("Width must be > 0")
+        pixels_per_tile = img_w / width_mm * tile_size_mm
+    elif method == "tiles":
+        tiles_x = int(params["tiles_x"])
+        if tiles_x <= 0:
+            raise ValueError("Tiles must be > 0")
+        pixels_per_tile = img_w / tiles_x
+    elif method == "sample":
+        pixels_per_tile = params.get("pixels_per_tile")
+        if pixels_per_tile is None:
+            raise ValueError("No sample selected")
+    else:
+        raise ValueError(f"Unknown scaling method: {method}")
+
+    return max(1, int(round(pixels_per_tile))), tile_size_mm
+
 
 class MapImportDialog(tk.Toplevel):
     def __init__(self, parent: tk.Tk, on_import: Callable[[str, str, int, float], None], default_tile_mm: float = 25.4):
@@ -37,11 +85,14 @@ class MapImportDialog(tk.Toplevel):
 
         self.img_w = 0
         self.img_h = 0
-        self._thumb_image: Optional[ImageTk.PhotoImage] = None
 
         # Sample method state
         self.sample_pixels_per_tile: Optional[float] = None
         self._sample_selector_img: Optional[ImageTk.PhotoImage] = None
+        # (path, original width, original height, pyramid) for the selector
+        self._sample_pyramid: Optional[tuple[str, int, int, list[Image.Image]]] = None
+        # Worker for sample-selector resizes, created on first use
+        self._resize_executor: Optional[ThreadPoolExecutor] = None
 
         self._build_ui()
         self.grab_set()
@@ -144,11 +195,12 @@ class MapImportDialog(tk.Toplevel):
 
     def _load_image_info(self, fp: str) -> None:
         try:
-            with Image.open(fp) as img:
-                self.img_w, self.img_h = img.size
-                thumb = img.copy()
-                thumb.thumbnail((200, 200))
-                self._thumb_image = ImageTk.PhotoImage(thumb)
+            # Header-only probe for PNG/JPEG; Pillow only for other formats
+            size = probe_image_size(Path(fp))
+            if size is None:
+                with Image.open(fp) as img:
+                    size = img.size
+            self.img_w, self.img_h = size
             # Default map name to filename if not provided
             if not self.name_var.get():
                 self.name_var.set(Path(fp).stem)
@@ -180,6 +232,46 @@ class MapImportDialog(tk.Toplevel):
     def _on_cancel(self) -> None:
         self.destroy()
 
+    def destroy(self) -> None:
+        if self._resize_executor is not None:
+            self._resize_executor.shutdown(wait=False, cancel_futures=True)
+            self._resize_executor = None
+        super().destroy()
+
+    def _get_sample_pyramid(
+        self, fp: str, max_w: int, max_h: int
+    ) -> tuple[int, int, list[Image.Image]]:
+        """
+        Decode the image for the sample selector, once per file.
+
+        Returns the original (pre-draft) size and a mipmap pyramid of
+        successive halvings, so each zoom resamples from the smallest level
+        still larger than the display rather than from the full image.
+        """
+        if self._sample_pyramid is not None and self._sample_pyramid[0] == fp:
+            _, img_w, img_h, pyramid = self._sample_pyramid
+            return img_w, img_h, pyramid
+
+        img = Image.open(fp)
+        # Size from the header; draft() below may shrink the decoded image
+        img_w, img_h = img.size
+
+        # Let JPEGs decode at reduced scale, keeping enough detail to zoom in
+        # on the fitted view. Coordinates always use the original size.
+        img.draft("RGB", (max_w, max_h))
+        img.load()
+        # Keep opaque images in their native mode rather than expanding to
+        # RGBA; only modes reduce() can't handle are converted
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA")
+
+        pyramid = [img]
+        while min(pyramid[-1].size) >= 256:
+            pyramid.append(pyramid[-1].reduce(2))
+
+        self._sample_pyramid = (fp, img_w, img_h, pyramid)
+        return img_w, img_h, pyramid
+
     def _open_sample_selector(self) -> None:
         """Open a window for the user to draw a 3x3 sample rectangle with zoom support."""
         fp = self.filepath_var.get()
@@ -189,15 +281,21 @@ class MapImportDialog(tk.Toplevel):
 
         # Create selector window
         sel_win = tk.Toplevel(self)
+        self._sample_selector_img = None
+        if self._resize_executor is None:
+            self._resize_executor = ThreadPoolExecutor(max_workers=1)
         sel_win.title("Select 3x3 sample region")
 
-        # Load original image
-        orig_img = Image.open(fp).convert("RGBA")
-        img_w, img_h = orig_img.size
-
         # Initial fit scale
         max_w, max_h = 1000, 700
+        img_w, img_h, pyramid = self._get_sample_pyramid(fp, max_w * 4, max_h * 4)
         scale = min(1.0, max_w / img_w, max_h / img_h)
+
+        def pyramid_source(target_w: int) -> Image.Image:
+            ratio = pyramid[0].width / max(1, target_w)
+            level = int(math.floor(math.log2(ratio))) if ratio > 1 else 0
+            return pyramid[min(level, len(pyramid) - 1)]
+
         display_w = int(img_w * scale)
         display_h = int(img_h * scale)
 
@@ -223,23 +321,68 @@ class MapImportDialog(tk.Toplevel):
         sel_rect_id = None
         image_item_id = None
 
-        def update_display():
-            """Redraw the image on the canvas at the current scale and clear selection."""
-            nonlocal display_w, display_h, sel_rect_id, image_item_id
-            display_w = int(img_w * scale)
-            display_h = int(img_h * scale)
-            display_img = orig_img.resize((display_w, display_h), Image.LANCZOS)
-            self._sample_selector_img = ImageTk.PhotoImage(display_img)
+        resize_future: Optional[Future] = None
+        # Width of the image actually on the canvas; scale and display_w run
+        # ahead of it while a resize is pending, so selections use this
+        shown_w: Optional[int] = None
+
+        def show_image(display_img: Image.Image) -> None:
+            """Put a resized image on the canvas (Tk thread only)."""
+            nonlocal image_item_id, shown_w, sel_rect_id
+            if shown_w is not None and display_img.width != shown_w and sel_rect_id:
+                # Drawn over the previous zoom level: it no longer matches
+                canvas.delete(sel_rect_id)
+                sel_rect_id = None
+                sel_start.clear()
+            shown_w = display_img.width
+            photo = self._sample_selector_img
+            if photo is not None and (photo.width(), photo.height()) == display_img.size:
+                # Same size (e.g. the full-quality redraw after a drag): update the
+                # existing Tk image in place instead of allocating a new one
+                photo.paste(display_img)
+            else:
+                self._sample_selector_img = ImageTk.PhotoImage(display_img)
             # Update or create image item
             if image_item_id is None:
                 image_item_id = canvas.create_image(0, 0, image=self._sample_selector_img, anchor=tk.NW)
+                # Keep any selection rectangle above the image
+                canvas.tag_lower(image_item_id)
             else:
                 canvas.itemconfigure(image_item_id, image=self._sample_selector_img)
 
+        def poll_resize(future: Future) -> None:
+            """Wait for a background resize and display it unless superseded."""
+            if future is not resize_future or not sel_win.winfo_exists():
+                return
+            if not future.done():
+                self.after(16, poll_resize, future)
+                return
+            if not future.cancelled() and future.exception() is None:
+                show_image(future.result())
+
+        def update_display(resample=Image.LANCZOS, clear_selection: bool = True):
+            """Redraw the image on the canvas at the current scale and clear selection.
+
+            Interactive redraws pass a cheaper resample filter; the final
+            redraw at the same scale keeps the selection. The resize itself
+            runs on a worker thread so the UI stays responsive.
+            """
+            nonlocal display_w, display_h, sel_rect_id, resize_future
+            display_w = int(img_w * scale)
+            display_h = int(img_h * scale)
+
+            if resize_future is not None:
+                # Superseded by this request (no-op if it already started)
+                resize_future.cancel()
+            resize_future = self._resize_executor.submit(
+                pyramid_source(display_w).resize, (display_w, display_h), resample
+            )
+            poll_resize(resize_future)
+
             # Update scroll region but DO NOT change canvas widget size (prevents window resize)
             canvas.config(scrollregion=(0, 0, display_w, display_h))
             # Clear selection on zoom change
-            if sel_rect_id:
+            if clear_selection and sel_rect_id:
                 try:
                     canvas.delete(sel_rect_id)
                 except Exception:
@@ -293,27 +436,70 @@ class MapImportDialog(tk.Toplevel):
         ctrl_fr = ttk.Frame(sel_win)
         ctrl_fr.pack(fill=tk.X, pady=(6, 0))
 
-        def set_scale(new_scale: float, update_slider: bool = True):
+        # Set while the slider is moved programmatically: ttk.Scale.set() also
+        # fires the slider command, which must not count as a user drag
+        syncing_slider = False
+
+        def sync_slider() -> None:
+            nonlocal syncing_slider
+            syncing_slider = True
+            try:
+                zoom_slider.set(int(scale * 100))
+            finally:
+                syncing_slider = False
+
+        def set_scale(new_scale: float, update_slider: bool = True, interactive: bool = False):
             nonlocal scale
             scale = max(0.05, min(4.0, new_scale))
-            update_display()
-            # Update slider only when requested and available
-            try:
-                if update_slider and 'zoom_slider' in locals():
-                    zoom_slider.set(int(scale * 100))
-            except Exception:
-                pass
+            update_display(Image.BILINEAR if interactive else Image.LANCZOS)
+            if update_slider:
+                sync_slider()
+
+        # Debounce: rapid zoom requests are coalesced into a single redraw
+        zoom_after_id = None
+        pending_scale = None
+
+        def schedule_scale(new_scale: float, update_slider: bool = True, interactive: bool = False):
+            nonlocal zoom_after_id, pending_scale
+            pending_scale = new_scale
+            if zoom_after_id is not None:
+                sel_win.after_cancel(zoom_after_id)
+
+            def apply_scale():
+                nonlocal zoom_after_id, pending_scale
+                zoom_after_id = None
+                pending_scale = None
+                set_scale(new_scale, update_slider, interactive)
+
+            zoom_after_id = sel_win.after(40, apply_scale)
 
         def zoom_in():
-            set_scale(scale * 1.25)
+            schedule_scale((pending_scale or scale) * 1.25)
 
         def zoom_out():
-            set_scale(scale / 1.25)
+            schedule_scale((pending_scale or scale) / 1.25)
+
+        def on_slider_change(value: str) -> None:
+            if not syncing_slider:
+                schedule_scale(float(value) / 100.0, False, interactive=True)
+
+        def on_slider_release(evt):
+            nonlocal zoom_after_id, pending_scale
+            if zoom_after_id is not None:
+                # A drag redraw is still pending: replace it with the final one
+                sel_win.after_cancel(zoom_after_id)
+                zoom_after_id = None
+                new_scale, pending_scale = pending_scale, None
+                set_scale(new_scale, False)
+            else:
+                update_display(Image.LANCZOS, clear_selection=False)
 
         ttk.Button(ctrl_fr, text="-", width=3, command=zoom_out).pack(side=tk.LEFT, padx=(0,6))
         ttk.Button(ctrl_fr, text="+", width=3, command=zoom_in).pack(side=tk.LEFT)
-        zoom_slider = ttk.Scale(ctrl_fr, from_=5, to=400, orient=tk.HORIZONTAL, command=lambda v: set_scale(float(v) / 100.0, False))
-        zoom_slider.set(int(scale * 100))
+        zoom_slider = ttk.Scale(ctrl_fr, from_=5, to=400, orient=tk.HORIZONTAL, command=on_slider_change)
+        sync_slider()
+        # Slider drags redraw with BILINEAR; redraw once with LANCZOS on release
+        zoom_slider.bind("<ButtonRelease-1>", on_slider_release)
         zoom_slider.pack(side=tk.LEFT, padx=8, fill=tk.X, expand=True)
 
         # Mouse wheel zoom
@@ -392,10 +578,9 @@ class MapImportDialog(tk.Toplevel):
                 messagebox.showerror("Error", "Invalid selection size.", parent=sel_win)
                 return
 
-            # Transform selection to original image pixels
-            # display_w = orig_w * scale
-            display_w_current = int(img_w * scale)
-            scale_back = (img_w / display_w_current) if display_w_current > 0 else 1.0
+            # Transform selection to original image pixels, using the zoom level
+            # the selection was drawn on (show_image clears it on a change)
+            scale_back = (img_w / shown_w) if shown_w else 1.0
             orig_sel_w = sel_w * scale_back
             orig_sel_h = sel_h * scale_back
 
@@ -434,37 +619,22 @@ class MapImportDialog(tk.Toplevel):
                 messagebox.showerror("Error", "Failed to read image dimensions.", parent=self)
                 return
 
+        if method not in SCALING_METHODS:
+            messagebox.showerror("Error", "Selected method not implemented.", parent=self)
+            return
+
         try:
+            params = {
+                "tile_size_mm": float(self.tile_size_mm_var.get()),
+                "default_tile_mm": self.default_tile_mm,
+            }
             if method == "image_width":
-                width_mm = float(self.image_width_mm_var.get())
-                if width_mm <= 0:
-                    raise ValueError("Width must be > 0")
-                tile_size_mm = float(self.tile_size_mm_var.get())
-                if tile_size_mm <= 0:
-                    tile_size_mm = self.default_tile_mm
-                ppmm = float(self.img_w) / float(width_mm)
-                tile_pixels = max(1, int(round(ppmm * float(tile_size_mm))))
-
+                params["width_mm"] = float(self.image_width_mm_var.get())
             elif method == "tiles":
-                tiles_x = int(self.tiles_x_var.get())
-                if tiles_x <= 0:
-                    raise ValueError("Tiles must be > 0")
-                tile_size_mm = float(self.tile_size_mm_var.get())
-                if tile_size_mm <= 0:
-                    tile_size_mm = self.default_tile_mm
-                tile_pixels = max(1, int(round(float(self.img_w) / float(tiles_x))))
-
-            elif method == "sample":
-                if self.sample_pixels_per_tile is None:
-                    raise ValueError("No sample selected")
-                tile_size_mm = float(self.tile_size_mm_var.get())
-                if tile_size_mm <= 0:
-                    tile_size_mm = self.default_tile_mm
-                tile_pixels = max(1, int(round(self.sample_pixels_per_tile)))
-
-            else:
-                messagebox.showerror("Error", "Selected method not implemented.", parent=self)
-                return
+                params["tiles_x"] = int(self.tiles_x_var.get())
+            else:  # sample
+                params["pixels_per_tile"] = self.sample_pixels_per_tile
+            tile_pixels, tile_size_mm = compute_tile_pixels(self.img_w, method, params)
         except Exception as e:
             messagebox.showerror("Error", f"Invalid input: {e}", parent=self)
             return
@@ -5,7 +5,7 @@ from typing import Optional
 import uuid
 
 
-@dataclass
+@dataclass(slots=True)
 class Map:
     """Represents a single map with its fog state."""
 
@@ -18,6 +18,15 @@ class Map:
     pan_x: int = 0  # Current pan position
     pan_y: int = 0
 
+    # Cached to_dict() result; assigning any public field marks it stale
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _dict_dirty: bool = field(default=True, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            object.__setattr__(self, "_dict_dirty", True)
+
     @classmethod
     def create(
         cls,
@@ -28,7 +37,8 @@ class Map:
     ) -> "Map":
         """Create a new map with auto-generated ID and fog path."""
         map_id = str(uuid.uuid4())[:8]
-        fog_path = image_path.rsplit(".", 1)[0] + "_fog.png"
+        # Several maps can share one image file, so the fog name includes the ID
+        fog_path = f"{image_path.rsplit('.', 1)[0]}_{map_id}_fog.png"
         return cls(
             id=map_id,
             name=name,
@@ -39,17 +49,25 @@ class Map:
         )
 
     def to_dict(self) -> dict:
-        """Convert to dictionary for JSON serialization."""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "image_file": self.image_path,
-            "fog_file": self.fog_path,
-            "tile_size_mm": self.tile_size_mm,
-            "tile_pixels": self.tile_pixels,
-            "pan_x": self.pan_x,
-            "pan_y": self.pan_y,
-        }
+        """
+        Convert to dictionary for JSON serialization.
+
+        The dictionary is cached until a field changes, so callers must not
+        modify it.
+        """
+        if self._dict_dirty or self._cached_dict is None:
+            self._cached_dict = {
+                "id": self.id,
+                "name": self.name,
+                "image_file": self.image_path,
+                "fog_file": self.fog_path,
+                "tile_size_mm": self.tile_size_mm,
+                "tile_pixels": self.tile_pixels,
+                "pan_x": self.pan_x,
+                "pan_y": self.pan_y,
+            }
+            self._dict_dirty = False
+        return self._cached_dict
 
     @classmethod
     def from_dict(cls, data: dict) -> "Map":
@@ -66,7 +84,7 @@ class Map:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     """Represents a DMView session containing multiple maps."""
 
@@ -74,6 +92,17 @@ class Session:
     maps: list[Map] = field(default_factory=list)
     active_map_index: int = 0
 
+    # Map id -> position in self.maps
+    _id_to_index: dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._rebuild_index()
+
+    def _rebuild_index(self, start: int = 0) -> None:
+        """Refresh id -> index entries for maps from position start onwards."""
+        for i in range(start, len(self.maps)):
+            self._id_to_index[self.maps[i].id] = i
+
     @property
     def active_map(self) -> Optional[Map]:
         """Get the currently active map, or None if no maps exist."""
@@ -84,24 +113,27 @@ class Session:
     def add_map(self, map_obj: Map) -> None:
         """Add a map to the session."""
         self.maps.append(map_obj)
+        self._id_to_index[map_obj.id] = len(self.maps) - 1
 
     def remove_map(self, map_id: str) -> bool:
         """Remove a map by ID. Returns True if removed."""
-        for i, m in enumerate(self.maps):
-            if m.id == map_id:
-                self.maps.pop(i)
-                if self.active_map_index >= len(self.maps):
-                    self.active_map_index = max(0, len(self.maps) - 1)
-                return True
-        return False
+        i = self._id_to_index.pop(map_id, None)
+        if i is None:
+            return False
+        self.maps.pop(i)
+        # Only maps after the removed one shift position
+        self._rebuild_index(i)
+        if self.active_map_index >= len(self.maps):
+            self.active_map_index = max(0, len(self.maps) - 1)
+        return True
 
     def set_active_map(self, map_id: str) -> bool:
         """Set active map by ID. Returns True if found."""
-        for i, m in enumerate(self.maps):
-            if m.id == map_id:
-                self.active_map_index = i
-                return True
-        return False
+        i = self._id_to_index.get(map_id)
+        if i is None:
+            return False
+        self.active_map_index = i
+        return True
 
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization."""
@@ -1,36 +1,181 @@
 """Session persistence - JSON load/save and fog mask management."""
 
+import hashlib
 import json
+import mmap
+import os
 import shutil
+import struct
+import uuid
 from pathlib import Path
-from typing import Optional
-
-from PIL import Image
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from models import Map, Session
 
+if TYPE_CHECKING:
+    from PIL import Image
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; the stdlib encoder is used when it is missing
+    orjson = None
+
+
+# Buffer size for the userspace copy fallback
+_COPY_BUFSIZE = 1024 * 1024
+
+
+def _copy_file_contents(source: Path, dest: Path) -> None:
+    """
+    Copy file data (not metadata) from source to dest.
+
+    Uses CopyFileW on Windows and os.sendfile elsewhere, so bytes are moved by
+    the kernel; falls back to a buffered copy where sendfile isn't supported
+    for regular files.
+    """
+    if os.name == "nt":
+        import ctypes
+
+        if not ctypes.windll.kernel32.CopyFileW(str(source), str(dest), False):
+            raise ctypes.WinError()
+        return
+
+    with open(source, "rb") as fsrc, open(dest, "wb") as fdst:
+        if hasattr(os, "posix_fadvise"):
+            # One-shot sequential read: read ahead aggressively
+            os.posix_fadvise(fsrc.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        size = os.fstat(fsrc.fileno()).st_size
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except (AttributeError, OSError):
+            if offset:
+                raise
+            # sendfile unavailable for regular files (e.g. macOS)
+            shutil.copyfileobj(fsrc, fdst, _COPY_BUFSIZE)
+
+
+def _hash_file(path: Path) -> str:
+    """Return a 128-bit BLAKE2b hex digest of a file's contents."""
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.blake2b(mm, digest_size=16).hexdigest()
+        except ValueError:
+            # Empty files can't be mapped
+            return hashlib.blake2b(b"", digest_size=16).hexdigest()
+
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG start-of-frame markers (SOF0..SOF15 minus DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def probe_image_size(path: Path) -> Optional[Tuple[int, int]]:
+    """
+    Read image dimensions straight from the PNG/JPEG header.
+
+    No pixel data is decoded and Pillow is not involved.
+
+    Args:
+        path: Image file path
+
+    Returns:
+        (width, height), or None for other formats or unreadable headers
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(24)
+            if head.startswith(_PNG_SIGNATURE):
+                # IHDR is always the first chunk: width/height at bytes 16-24
+                if len(head) < 24 or head[12:16] != b"IHDR":
+                    return None
+                return struct.unpack(">II", head[16:24])
+
+            if not head.startswith(b"\xff\xd8"):
+                return None
+
+            # Walk the JPEG segments until a start-of-frame marker
+            f.seek(2)
+            while True:
+                byte = f.read(1)
+                if not byte:
+                    return None
+                if byte != b"\xff":
+                    continue
+                marker = f.read(1)
+                while marker == b"\xff":
+                    # Fill bytes before a marker
+                    marker = f.read(1)
+                if not marker:
+                    return None
+                code = marker[0]
+                if code == 0x01 or 0xD0 <= code <= 0xD9:
+                    # Standalone markers carry no length
+                    continue
+                length_bytes = f.read(2)
+                if len(length_bytes) < 2:
+                    return None
+                (length,) = struct.unpack(">H", length_bytes)
+                if code in _JPEG_SOF_MARKERS:
+                    frame = f.read(5)
+                    if len(frame) < 5:
+                        return None
+                    height, width = struct.unpack(">xHH", frame)
+                    return width, height
+                f.seek(length - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
 
 class SessionManager:
     """Manages session file operations."""
 
+    # Lowercase file extension -> Pillow format name, built on first image open
+    _ext_to_format: Optional[dict[str, str]] = None
+
     def __init__(self, session_dir: Path):
         """Initialize with session directory path."""
         self.session_dir = Path(session_dir)
         self.session_file = self.session_dir / "session.json"
         self.maps_dir = self.session_dir / "maps"
+        # Creates the session directory too, so nothing else needs to mkdir
+        os.makedirs(self.maps_dir, exist_ok=True)
 
     @classmethod
     def create_new(cls, base_dir: Path, session_name: str) -> "SessionManager":
         """Create a new session directory structure."""
         session_dir = base_dir / session_name.lower().replace(" ", "_")
-        session_dir.mkdir(parents=True, exist_ok=True)
-        (session_dir / "maps").mkdir(exist_ok=True)
-
         manager = cls(session_dir)
         session = Session(name=session_name)
         manager.save_session(session)
         return manager
 
+    @classmethod
+    def _open_image(cls, path: Path) -> "Image.Image":
+        """Open an image, telling Pillow its format up front based on the extension."""
+        # Imported lazily so loading this module doesn't initialize Pillow plugins
+        from PIL import Image, UnidentifiedImageError
+
+        if cls._ext_to_format is None:
+            cls._ext_to_format = Image.registered_extensions()
+
+        fmt = cls._ext_to_format.get(path.suffix.lower())
+        if fmt:
+            try:
+                return Image.open(path, formats=[fmt])
+            except UnidentifiedImageError:
+                # Extension doesn't match the content; let Pillow probe
+                pass
+        return Image.open(path)
+
     @classmethod
     def open_existing(cls, session_dir: Path) -> Optional["SessionManager"]:
         """Open an existing session directory."""
@@ -40,18 +185,36 @@ class SessionManager:
         return cls(session_dir)
 
     def save_session(self, session: Session) -> None:
-        """Save session to JSON file."""
-        with open(self.session_file, "w") as f:
-            json.dump(session.to_dict(), f, indent=2)
+        """
+        Save session to JSON file.
+
+        The JSON is written compactly to a temporary file that then replaces
+        session.json, so a crash mid-save never leaves a truncated session
+        behind.
+        """
+        data = session.to_dict()
+        tmp_file = self.session_file.with_name(self.session_file.name + ".tmp")
+
+        try:
+            if orjson is not None:
+                with open(tmp_file, "wb") as f:
+                    f.write(orjson.dumps(data))
+            else:
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_file, self.session_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
 
     def load_session(self) -> Optional[Session]:
         """Load session from JSON file."""
-        if not self.session_file.exists():
-            return None
         try:
-            with open(self.session_file) as f:
+            with open(self.session_file, encoding="utf-8") as f:
                 data = json.load(f)
             return Session.from_dict(data)
+        except FileNotFoundError:
+            return None
         except (json.JSONDecodeError, KeyError) as e:
             print(f"Error loading session: {e}")
             return None
@@ -65,22 +228,26 @@ class SessionManager:
     ) -> Map:
         """Import a map image and create fog mask."""
         source_path = Path(source_path)
-        self.maps_dir.mkdir(exist_ok=True)
 
-        # Copy image to maps directory
-        dest_filename = source_path.name
+        # Store the image under its content hash, so importing the same file
+        # again (e.g. to redo the scaling) reuses the stored copy. The copy goes
+        # to a temporary name first; a concurrent import of the same content
+        # writes identical bytes, so whichever replace lands last is fine.
+        dest_filename = f"{_hash_file(source_path)}{source_path.suffix}"
         dest_path = self.maps_dir / dest_filename
+        try:
+            already_stored = dest_path.stat().st_size == source_path.stat().st_size
+        except FileNotFoundError:
+            already_stored = False
 
-        # Handle filename conflicts
-        counter = 1
-        while dest_path.exists():
-            stem = source_path.stem
-            suffix = source_path.suffix
-            dest_filename = f"{stem}_{counter}{suffix}"
-            dest_path = self.maps_dir / dest_filename
-            counter += 1
-
-        shutil.copy2(source_path, dest_path)
+        if not already_stored:
+            tmp_path = self.maps_dir / f"{dest_filename}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                _copy_file_contents(source_path, tmp_path)
+                os.replace(tmp_path, dest_path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
 
         # Create map object with relative path
         relative_path = f"maps/{dest_filename}"
@@ -101,12 +268,19 @@ class SessionManager:
         image_path = self.session_dir / map_obj.image_path
         fog_path = self.session_dir / map_obj.fog_path
 
-        with Image.open(image_path) as img:
-            width, height = img.size
+        from PIL import Image
+
+        # Only the dimensions are needed; avoid Pillow when the header suffices
+        size = probe_image_size(image_path)
+        if size is None:
+            with self._open_image(image_path) as img:
+                size = img.size
+        width, height = size
 
-        # Create all-black mask (fully hidden)
-        fog = Image.new("L", (width, height), 0)
-        fog.save(fog_path)
+        # Create all-black mask (fully hidden). A blank mask is purely binary,
+        # so store it bit-packed; load_fog_mask converts back to "L".
+        fog = Image.new("1", (width, height), 0)
+        fog.save(fog_path, compress_level=1)
 
     def get_map_image_path(self, map_obj: Map) -> Path:
         """Get absolute path to map image."""
@@ -116,31 +290,67 @@ class SessionManager:
         """Get absolute path to fog mask."""
         return self.session_dir / map_obj.fog_path
 
-    def load_map_image(self, map_obj: Map) -> Optional[Image.Image]:
+    def load_map_image(self, map_obj: Map) -> Optional["Image.Image"]:
         """Load map image as PIL Image."""
         path = self.get_map_image_path(map_obj)
         if path.exists():
-            return Image.open(path)
+            return self._open_image(path)
         return None
 
-    def load_fog_mask(self, map_obj: Map) -> Optional[Image.Image]:
+    def load_fog_mask(self, map_obj: Map) -> Optional["Image.Image"]:
         """Load fog mask as PIL Image (grayscale)."""
         path = self.get_fog_path(map_obj)
         if path.exists():
-            return Image.open(path).convert("L")
+            img = self._open_image(path)
+            # Decode now so Pillow releases the file handle; an open handle
+            # would keep delete_map from unlinking the file on Windows
+            img.load()
+            if img.mode == "L":
+                # Already grayscale: convert() would only copy the pixels
+                return img
+            return img.convert("L")
         return None
 
-    def save_fog_mask(self, map_obj: Map, fog: Image.Image) -> None:
-        """Save fog mask to disk."""
+    def save_fog_mask(
+        self, map_obj: Map, fog: "Image.Image", compress_level: int = 1
+    ) -> None:
+        """
+        Save fog mask to disk.
+
+        Fog is binary in practice (brushes paint 0 or 255), so it is stored as
+        a bit-packed 1-bit PNG with values >= 128 counting as revealed.
+        load_fog_mask converts it back to "L".
+
+        Args:
+            map_obj: Map the fog belongs to
+            fog: Fog mask image
+            compress_level: PNG zlib level; the fast default suits saves during
+                play, 9 gives the smallest files
+        """
+        import numpy as np
+        from PIL import Image
+
+        if fog.mode != "L":
+            fog = fog.convert("L")
+        packed = np.packbits(np.asarray(fog) >= 128, axis=1)
+        bits = Image.frombytes("1", fog.size, packed.tobytes())
+
         path = self.get_fog_path(map_obj)
-        fog.save(path)
+        bits.save(path, compress_level=compress_level)
+
+    def delete_map(self, map_obj: Map, keep_image: bool = False) -> None:
+        """
+        Delete map image and fog mask files.
 
-    def delete_map(self, map_obj: Map) -> None:
-        """Delete map image and fog mask files."""
+        Args:
+            map_obj: Map whose files to delete
+            keep_image: Leave the image in place, e.g. because another map
+                imported the same file and shares it
+        """
         image_path = self.get_map_image_path(map_obj)
         fog_path = self.get_fog_path(map_obj)
 
-        if image_path.exists():
+        if not keep_image and image_path.exists():
             image_path.unlink()
         if fog_path.exists():
             fog_path.unlink()
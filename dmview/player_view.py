@@ -1,19 +1,31 @@
 """Player view - fullscreen display window for the projector/player monitor."""
 
 import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import TYPE_CHECKING, Optional
 
-from PIL import Image, ImageTk
+import numpy as np
+from PIL import Image
 
 from map_canvas import MapRenderer
 
 if TYPE_CHECKING:
     from app import Application
+    from models import Map
+
+
+def _ppm(rgb: np.ndarray) -> bytes:
+    """Encode an (h, w, 3) uint8 array as binary PPM (P6) for Tk."""
+    height, width = rgb.shape[:2]
+    return b"P6 %d %d 255\n" % (width, height) + rgb.tobytes()
 
 
 class PlayerView:
     """Fullscreen window displaying the map on the player monitor."""
 
+    # Number of rendered frames kept for instant flips back to a recent state
+    _PHOTO_CACHE_SIZE = 2
+
     def __init__(self, root: tk.Tk, app: "Application"):
         """
         Initialize the player view.
@@ -32,6 +44,12 @@ class PlayerView:
 
         # Remove window decorations for fullscreen
         self.window.overrideredirect(True)
+        # Window-manager state last applied by set_fullscreen
+        self._topmost = False
+        self._last_geom: Optional[tuple[int, int, int, int]] = None
+        # Geometry requested by set_fullscreen, applied when Tk is idle
+        self._pending_geom: Optional[tuple[int, int, int, int]] = None
+        self._fullscreen_after: Optional[str] = None
 
         # Create canvas for display
         self.canvas = tk.Canvas(
@@ -42,43 +60,139 @@ class PlayerView:
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
         # Store current image reference to prevent garbage collection
-        self._current_image: Optional[ImageTk.PhotoImage] = None
+        self._current_image: Optional[tk.PhotoImage] = None
         self._canvas_image_id: Optional[int] = None
 
+        # Resize debouncing: pending after() id and the last rendered viewport size
+        self._resize_after: Optional[str] = None
+        self._last_size: Optional[tuple[int, int]] = None
+        # Inputs of the frame on screen; refresh() skips rendering when unchanged
+        self._last_key: Optional[tuple] = None
+        # Recently shown frames by refresh key, oldest first (current + previous)
+        self._photo_cache: dict[tuple, tk.PhotoImage] = {}
+        # Refresh key of the renderer's most recent frame (see _pump_render)
+        self._rendered_key: Optional[tuple] = None
+
+        # Frames render on a worker thread, which alone touches the renderer:
+        # map, scale and fog changes are queued behind the frame in flight
+        # rather than waiting for it. The latest request waits in _wanted.
+        self._render_executor = ThreadPoolExecutor(max_workers=1)
+        self._render_future: Optional[Future] = None
+        self._wanted: Optional[tuple] = None
+        # Renderer inputs as last queued, for the Tk thread (see refresh)
+        self._map_image: Optional[Image.Image] = None
+        self._fog_mask: Optional[Image.Image] = None
+        self._fog_version = 0
+        self._scale = 1.0
+        # Queued renderer state changes not yet checked for errors
+        self._state_futures: list[Future] = []
+        # Frame buffer the worker composes into; reallocated on viewport resize
+        self._rgb_buf: Optional[np.ndarray] = None
+        # Active map as of the app's _active_map_version (see refresh)
+        self._active_map: Optional["Map"] = None
+        self._active_map_version: Optional[int] = None
+        # Latest fog mask not yet handed to the renderer; applied when Tk is idle
+        self._pending_fog: Optional[Image.Image] = None
+        self._fog_after: Optional[str] = None
+        # Set when refresh() was skipped because the window was hidden
+        self._needs_refresh = False
+
         # Bind resize event
         self.canvas.bind("<Configure>", self._on_resize)
+        # Catch up on refreshes skipped while hidden once the window is mapped
+        self.window.bind("<Map>", self._on_map)
 
     def position_on_monitor(self, x: int, y: int, width: int, height: int) -> None:
         """Position the window on the specified monitor area."""
         self.window.geometry(f"{width}x{height}+{x}+{y}")
 
     def set_fullscreen(self, monitor_x: int, monitor_y: int, width: int, height: int) -> None:
-        """Set the window to fullscreen on the specified monitor."""
-        self.position_on_monitor(monitor_x, monitor_y, width, height)
-        self.window.attributes("-topmost", True)
+        """
+        Set the window to fullscreen on the specified monitor.
+
+        The change is applied as one block when Tk is next idle (or on
+        show()), so several calls in a row cost a single update.
+        """
+        self._pending_geom = (monitor_x, monitor_y, width, height)
+        if self._fullscreen_after is None:
+            self._fullscreen_after = self.window.after_idle(self._apply_fullscreen)
+
+    def _apply_fullscreen(self) -> None:
+        """
+        Apply the geometry queued by set_fullscreen.
+
+        Each step is a window-manager round trip, so only what differs from
+        the last applied state is sent.
+        """
+        if self._fullscreen_after is not None:
+            self.window.after_cancel(self._fullscreen_after)
+            self._fullscreen_after = None
+        geom, self._pending_geom = self._pending_geom, None
+        if geom is None or (geom == self._last_geom and self._topmost):
+            return
+        if geom != self._last_geom:
+            self.position_on_monitor(*geom)
+            self._last_geom = geom
+        if not self._topmost:
+            self.window.attributes("-topmost", True)
+            self._topmost = True
         self.window.lift()
 
+    @property
+    def scale(self) -> float:
+        """Display scale as last set (the renderer may still be catching up)."""
+        return self._scale
+
     def set_map(self, map_image: Image.Image, fog_mask: Image.Image) -> None:
         """Set the map and fog mask to display."""
-        self.renderer.set_map(map_image, fog_mask)
+        # A queued mask belongs to the previous map
+        self._pending_fog = None
+        self._map_image = map_image
+        self._fog_mask = fog_mask
+        self._fog_version += 1
+        self._queue_state(self.renderer.set_map, map_image, fog_mask)
         self.refresh()
 
     def set_scale(self, scale: float) -> None:
         """Set the display scale."""
-        self.renderer.set_scale(scale)
+        self._scale = scale
+        self._queue_state(self.renderer.set_scale, scale)
         self.refresh()
 
     def update_fog(self, fog_mask: Image.Image) -> None:
-        """Update the fog mask and refresh display."""
-        if self.renderer.map_image is not None:
-            self.renderer.fog_mask = fog_mask.convert("L")
-            self.renderer.invalidate_cache()
-            self.refresh()
+        """
+        Update the fog mask and refresh display.
+
+        Updates are coalesced: the mask is applied once Tk is idle, and only
+        the latest of several quick updates is rendered.
+        """
+        if self._map_image is None:
+            return
+        self._pending_fog = fog_mask
+        if self._fog_after is None:
+            self._fog_after = self.window.after_idle(self._flush_fog)
+
+    def _flush_fog(self) -> None:
+        """Apply the most recent fog mask queued by update_fog."""
+        self._fog_after = None
+        fog_mask, self._pending_fog = self._pending_fog, None
+        if fog_mask is None or self._map_image is None:
+            return
+        self._fog_mask = fog_mask
+        self._fog_version += 1
+        self._queue_state(self.renderer.set_fog, fog_mask)
+        self.refresh()
 
     def refresh(self) -> None:
         """Refresh the display with current map state."""
-        if self.renderer.map_image is None:
+        if self._map_image is None:
+            return
+        if not self.window.winfo_viewable():
+            # Nobody sees a withdrawn window, and some Tk versions still report
+            # its old size; render once it is shown again
+            self._needs_refresh = True
             return
+        self._needs_refresh = False
 
         # Get viewport size
         width = self.canvas.winfo_width()
@@ -86,39 +200,217 @@ class PlayerView:
 
         if width <= 1 or height <= 1:
             return
+        self._last_size = (width, height)
 
-        # Get pan position from active map
+        # Get pan position from active map, looked up again only after a switch
+        if self._active_map_version != self.app._active_map_version:
+            self._active_map = self.app.get_active_map()
+            self._active_map_version = self.app._active_map_version
         pan_x, pan_y = 0, 0
-        active_map = self.app.get_active_map()
+        active_map = self._active_map
         if active_map:
             pan_x = active_map.pan_x
             pan_y = active_map.pan_y
 
-        # Render the map
-        self._current_image = self.renderer.render(
-            viewport_size=(width, height),
+        # set_map/set_fog bump the fog version, so it also covers map changes
+        key = (
+            width,
+            height,
+            pan_x,
+            pan_y,
+            self._scale,
+            id(self._fog_mask),
+            self._fog_version,
+        )
+        self._wanted = (key, (width, height), pan_x, pan_y)
+        self._pump_render()
+
+    def _pump_render(self) -> None:
+        """
+        Bring the screen up to date with the latest refresh request.
+
+        Frames are rendered on a worker thread, one at a time; requests made
+        while a frame is in flight replace each other, so only the newest is
+        rendered next. Everything touching Tk stays on the Tk thread.
+        """
+        if self._render_future is not None or self._wanted is None:
+            return
+        key, size, pan_x, pan_y = self._wanted
+        self._wanted = None
+        if key == self._last_key:
+            return
+
+        photo = self._photo_cache.pop(key, None)
+        if photo is not None:
+            # Most recently shown last
+            self._photo_cache[key] = photo
+            self._last_key = key
+            self._show(photo, size)
+            return
+
+        # The renderer can patch its most recent frame if that is the one shown
+        # and only the fog has changed since
+        last_key = self._last_key
+        patchable = (
+            last_key is not None
+            and last_key == self._rendered_key
+            and last_key[:5] == key[:5]
+            and last_key in self._photo_cache
+        )
+        self._render_future = self._render_executor.submit(
+            self._render_frame, patchable, size, pan_x, pan_y
+        )
+        self._poll_render(key, size)
+
+    def _render_frame(
+        self, patchable: bool, size: tuple[int, int], pan_x: int, pan_y: int
+    ) -> tuple[bool, object]:
+        """
+        Render a frame on the worker thread, encoded as PPM for Tk.
+
+        Returns:
+            (True, [(x, y, ppm), ...]) from render_fog_update when patching
+            the shown frame suffices, otherwise (False, ppm) for the whole
+            frame, or (False, None) if nothing is visible
+        """
+        if patchable:
+            patches = self.renderer.render_fog_update(size, pan_x, pan_y, is_dm_view=False)
+            if patches is not None:
+                return True, [(x, y, _ppm(rgb)) for x, y, rgb in patches]
+
+        # The frame buffer is reused: the PPM data is its own copy
+        width, height = size
+        if self._rgb_buf is None or self._rgb_buf.shape[:2] != (height, width):
+            self._rgb_buf = np.empty((height, width, 3), dtype=np.uint8)
+        frame = self.renderer.render_array(
+            viewport_size=size,
             pan_x=pan_x,
             pan_y=pan_y,
             is_dm_view=False,
+            out=self._rgb_buf,
         )
+        return False, None if frame is None else _ppm(frame)
 
-        if self._current_image:
-            # Clear and redraw
-            self.canvas.delete("all")
+    def _poll_render(self, key: tuple, size: tuple[int, int]) -> None:
+        """Wait for the frame in flight, put it on screen, then render the next one."""
+        if not self.window.winfo_exists():
+            return
+        future = self._render_future
+        if not future.done():
+            self.window.after(8, self._poll_render, key, size)
+            return
+        self._render_future = None
+        try:
+            # State changes queued before this frame have run by now
+            self._check_state_changes()
+            patched, result = future.result()
+            self._rendered_key = key
+            if patched:
+                self._apply_patches(self._last_key, key, result)
+            elif result is not None:
+                photo = self._photo_for(size)
+                self._put_ppm(photo, result, 0, 0)
+                self._photo_cache[key] = photo
+                self._show(photo, size)
+            self._last_key = key
+        except Exception:
+            # The renderer's last frame is unknown; don't patch it
+            self._rendered_key = None
+            raise
+        finally:
+            self._pump_render()
+
+    def _queue_state(self, method, *args) -> None:
+        """Run a renderer state change on the worker, after the frame in flight."""
+        self._state_futures.append(self._render_executor.submit(method, *args))
+
+    def _check_state_changes(self) -> None:
+        """Raise the first error from queued state changes that have finished."""
+        pending = []
+        error = None
+        for future in self._state_futures:
+            if not future.done():
+                pending.append(future)
+            elif error is None and not future.cancelled():
+                error = future.exception()
+        self._state_futures = pending
+        if error is not None:
+            # The renderer kept its previous state, so the refresh keys no
+            # longer describe it: render the next request from scratch
+            self._rendered_key = None
+            self._last_key = None
+            raise error
+
+    def _apply_patches(
+        self, last_key: tuple, key: tuple, patches: list[tuple[int, int, bytes]]
+    ) -> None:
+        """Write fog patches into the shown frame, which then shows state key."""
+        photo = self._photo_cache.pop(last_key)
+        for x, y, ppm in patches:
+            self._put_ppm(photo, ppm, x, y)
+        self._photo_cache[key] = photo
+
+    def _put_ppm(self, photo: tk.PhotoImage, ppm: bytes, x: int, y: int) -> None:
+        """Write PPM data into a Tk image at (x, y), leaving the rest untouched."""
+        # Tk decodes binary PPM straight into the photo: no PIL or Tcl string
+        # conversion, and no new Tk image
+        self.canvas.tk.call(photo.name, "put", ppm, "-format", "ppm", "-to", x, y)
+
+    def _photo_for(self, size: tuple[int, int]) -> tk.PhotoImage:
+        """Get a Tk image of the given size to hold a newly rendered frame."""
+        # Keep at most two frames; the evicted one is never on screen, so its
+        # Tk image can be overwritten when the size matches
+        recycled = None
+        while len(self._photo_cache) >= self._PHOTO_CACHE_SIZE:
+            oldest = next(iter(self._photo_cache))
+            recycled = self._photo_cache.pop(oldest)
+        if recycled is not None and (recycled.width(), recycled.height()) == size:
+            return recycled
+        width, height = size
+        return tk.PhotoImage(master=self.canvas, width=width, height=height)
+
+    def _show(self, photo: tk.PhotoImage, size: tuple[int, int]) -> None:
+        """Display a frame, reusing the canvas item: only its image and position change."""
+        width, height = size
+        self._current_image = photo
+        if self._canvas_image_id is None:
             self._canvas_image_id = self.canvas.create_image(
                 width // 2,
                 height // 2,
                 image=self._current_image,
                 anchor=tk.CENTER,
             )
+        else:
+            self.canvas.itemconfigure(self._canvas_image_id, image=self._current_image)
+            self.canvas.coords(self._canvas_image_id, width // 2, height // 2)
 
     def _on_resize(self, event: tk.Event) -> None:
-        """Handle canvas resize."""
+        """Handle canvas resize, rendering once the size stops changing."""
+        if self._resize_after is not None:
+            self.window.after_cancel(self._resize_after)
+            self._resize_after = None
+        if (event.width, event.height) == self._last_size:
+            # Spurious <Configure> (e.g. a move) or a drag back to the rendered size
+            return
+        self._resize_after = self.window.after(50, self._do_refresh)
+
+    def _do_refresh(self) -> None:
+        """Run the refresh deferred by _on_resize."""
+        self._resize_after = None
         self.refresh()
 
     def show(self) -> None:
         """Show the player window."""
+        # Map the window at its final position rather than moving it after
+        self._apply_fullscreen()
         self.window.deiconify()
+        if self._needs_refresh and self.window.winfo_viewable():
+            self.refresh()
+
+    def _on_map(self, event: tk.Event) -> None:
+        """Render the refresh skipped while the window was hidden."""
+        if self._needs_refresh:
+            self.refresh()
 
     def hide(self) -> None:
         """Hide the player window."""
@@ -126,4 +418,5 @@ class PlayerView:
 
     def destroy(self) -> None:
         """Destroy the player window."""
+        self._render_executor.shutdown(wait=False, cancel_futures=True)
         self.window.destroy()